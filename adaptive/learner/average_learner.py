@@ -144,3 +144,8 @@ class AverageLearner(BaseLearner):
 
     def _set_data(self, data):
         self.data, self.npoints, self.sum_f, self.sum_f_sq = data
+
+    def __getstate__(self):
+        return self._shallow_state(
+            data=self.data.copy(), pending_points=self.pending_points.copy()
+        )
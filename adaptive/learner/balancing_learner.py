@@ -138,22 +138,26 @@ class BalancingLearner(BaseLearner):
     def _ask_and_tell_based_on_loss_improvements(self, n):
         selected = []  # tuples ((learner_index, point), loss_improvement)
         total_points = [l.npoints + len(l.pending_points) for l in self.learners]
+        learners = list(enumerate(self.learners))
+        ask_cache = self._ask_cache
+        tell_pending = self.tell_pending
         for _ in range(n):
-            to_select = []
-            for index, learner in enumerate(self.learners):
+            # Choose the optimal improvement in a single pass, on ties the
+            # learner with the fewest points (and then the lowest index) wins.
+            best = best_key = None
+            for index, learner in learners:
                 # Take the points from the cache
-                if index not in self._ask_cache:
-                    self._ask_cache[index] = learner.ask(n=1, tell_pending=False)
-                points, loss_improvements = self._ask_cache[index]
-                to_select.append(
-                    ((index, points[0]), (loss_improvements[0], -total_points[index]))
-                )
-
-            # Choose the optimal improvement.
-            (index, point), (loss_improvement, _) = max(to_select, key=itemgetter(1))
+                if index not in ask_cache:
+                    ask_cache[index] = learner.ask(n=1, tell_pending=False)
+                points, loss_improvements = ask_cache[index]
+                key = (loss_improvements[0], -total_points[index])
+                if best_key is None or key > best_key:
+                    best, best_key = (index, points[0]), key
+
+            index, point = best
             total_points[index] += 1
-            selected.append(((index, point), loss_improvement))
-            self.tell_pending((index, point))
+            selected.append((best, best_key[0]))
+            tell_pending(best)
 
         points, loss_improvements = map(list, zip(*selected))
         return points, loss_improvements
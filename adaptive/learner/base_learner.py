@@ -195,3 +195,15 @@ class BaseLearner(metaclass=_RequireAttrsABCMeta):
 
     def __setstate__(self, state):
         self.__dict__ = state
+
+    def _shallow_state(self, **copies):
+        """Return a shallow copy of the state, which learners can use
+        in '__getstate__' instead of the 'deepcopy' when only a few
+        containers are modified in place. Those containers must be
+        passed as copies in ``copies``."""
+        state = self.__dict__.copy()
+        state.update(copies)
+        if "_cache" in state:
+            # Filled by 'adaptive.utils.cache_latest'.
+            state["_cache"] = self._cache.copy()
+        return state
@@ -1,3 +1,4 @@
+import heapq
 import itertools
 import math
 from collections.abc import Iterable
@@ -51,6 +52,20 @@ def default_loss(xs, ys):
         return np.hypot(dx, dy)
 
 
+def _default_losses(xs_left, xs_right, ys_left, ys_right):
+    """Vectorized version of `default_loss` for many intervals at once.
+
+    Takes arrays of the (scaled) x-values and y-values of the left and
+    right points of the intervals and returns an array of losses.
+    """
+    dx = xs_right - xs_left
+    dy = ys_right - ys_left
+    if dy.ndim > 1:
+        return np.hypot(dx[:, None], np.abs(dy)).max(axis=1)
+    else:
+        return np.hypot(dx, dy)
+
+
 @uses_nth_neighbors(1)
 def triangle_loss(xs, ys):
     xs = [x for x in xs if x is not None]
@@ -100,22 +115,38 @@ def linspace(x_left, x_right, n):
         return [x_left + step * i for i in range(1, n)]
 
 
+def _linspaces(x_lefts, x_rights, ns, losses):
+    """Vectorized version of concatenating 'linspace(x_left, x_right, n)'
+    for many intervals, returning the same points.
+
+    Also returns the loss of each interval, repeated once for every point
+    in that interval.
+    """
+    counts = ns.astype(int) - 1
+    steps = (x_rights - x_lefts) / ns
+    # The index of each point inside its interval, starting at 1.
+    starts = np.cumsum(counts) - counts
+    i = np.arange(1, counts.sum() + 1) - np.repeat(starts, counts)
+    points = np.repeat(x_lefts, counts) + np.repeat(steps, counts) * i
+    loss_improvements = np.repeat(losses, counts)
+    return points.tolist(), loss_improvements.tolist()
+
+
 def _get_neighbors_from_list(xs):
     xs = np.sort(xs)
     xs_left = np.roll(xs, 1).tolist()
     xs_right = np.roll(xs, -1).tolist()
     xs_left[0] = None
     xs_right[-1] = None
-    neighbors = {x: [x_L, x_R] for x, x_L, x_R in zip(xs, xs_left, xs_right)}
-    return sortedcontainers.SortedDict(neighbors)
+    return {x: [x_L, x_R] for x, x_L, x_R in zip(xs, xs_left, xs_right)}
 
 
-def _get_intervals(x, neighbors, nth_neighbors):
+def _get_intervals(x, keys, nth_neighbors):
     nn = nth_neighbors
-    i = neighbors.index(x)
+    i = keys.index(x)
     start = max(0, i - nn - 1)
-    end = min(len(neighbors), i + nn + 2)
-    points = neighbors.keys()[start:end]
+    end = min(len(keys), i + nn + 2)
+    points = keys[start:end]
     return list(zip(points, points[1:]))
 
 
@@ -183,8 +214,14 @@ class Learner1D(BaseLearner):
 
         # A dict {x_n: [x_{n-1}, x_{n+1}]} for quick checking of local
         # properties.
-        self.neighbors = sortedcontainers.SortedDict()
-        self.neighbors_combined = sortedcontainers.SortedDict()
+        self.neighbors = {}
+        self.neighbors_combined = {}
+
+        # The sorted keys of 'neighbors' and 'neighbors_combined', used for
+        # the bisection in '_find_neighbors'. A plain dict with a separate
+        # 'SortedList' is much cheaper than a 'SortedDict'.
+        self._neighbor_keys = sortedcontainers.SortedList()
+        self._neighbor_keys_combined = sortedcontainers.SortedList()
 
         # Bounding box [[minx, maxx], [miny, maxy]].
         self._bbox = [list(bounds), [np.inf, -np.inf]]
@@ -249,9 +286,9 @@ class Learner1D(BaseLearner):
         return y / y_scale
 
     def _get_point_by_index(self, ind):
-        if ind < 0 or ind >= len(self.neighbors):
+        if ind < 0 or ind >= len(self._neighbor_keys):
             return None
-        return self.neighbors.keys()[ind]
+        return self._neighbor_keys[ind]
 
     def _get_loss_in_interval(self, x_left, x_right):
         assert x_left is not None and x_right is not None
@@ -260,7 +297,7 @@ class Learner1D(BaseLearner):
             return 0
 
         nn = self.nth_neighbors
-        i = self.neighbors.index(x_left)
+        i = self._neighbor_keys.index(x_left)
         start = i - nn
         end = i + nn + 2
 
@@ -278,6 +315,9 @@ class Learner1D(BaseLearner):
             return
 
         loss = self._get_loss_in_interval(x_left, x_right)
+        self._set_interpolated_loss_in_interval(x_left, x_right, loss)
+
+    def _set_interpolated_loss_in_interval(self, x_left, x_right, loss):
         self.losses[x_left, x_right] = loss
 
         # Iterate over all interpolated intervals in between
@@ -289,14 +329,47 @@ class Learner1D(BaseLearner):
             self.losses_combined[a, b] = (b - a) * loss / dx
             a = b
 
+    def _get_losses_in_intervals(self, intervals):
+        """Like `_get_loss_in_interval`, but for many intervals at once.
+
+        For the `default_loss` the losses are computed in a single
+        vectorized pass, see `_default_losses`."""
+        if self.loss_per_interval is not default_loss or not intervals:
+            return [self._get_loss_in_interval(*ival) for ival in intervals]
+
+        xs_left, xs_right = zip(*intervals)
+        ys_left = np.array([self.data[x] for x in xs_left], dtype=float)
+        ys_right = np.array([self.data[x] for x in xs_right], dtype=float)
+
+        x_scale = self._scale[0]
+        y_scale = self._scale[1] or 1
+        losses = _default_losses(
+            np.divide(xs_left, x_scale),
+            np.divide(xs_right, x_scale),
+            ys_left / y_scale,
+            ys_right / y_scale,
+        )
+        losses[np.subtract(xs_right, xs_left) < self._dx_eps] = 0
+        return losses
+
+    def _recompute_all_losses(self):
+        """Recompute the losses of all "real" intervals and the
+        interpolated intervals inside of them."""
+        intervals = list(self.losses)
+        losses = self._get_losses_in_intervals(intervals)
+        for ival, loss in zip(intervals, losses):
+            self._set_interpolated_loss_in_interval(*ival, loss)
+
     def _update_losses(self, x, real=True):
         """Update all losses that depend on x"""
         # When we add a new point x, we should update the losses
         # (x_left, x_right) are the "real" neighbors of 'x'.
-        x_left, x_right = self._find_neighbors(x, self.neighbors)
+        x_left, x_right = self._find_neighbors(x, self.neighbors, self._neighbor_keys)
         # (a, b) are the neighbors of the combined interpolated
         # and "real" intervals.
-        a, b = self._find_neighbors(x, self.neighbors_combined)
+        a, b = self._find_neighbors(
+            x, self.neighbors_combined, self._neighbor_keys_combined
+        )
 
         # (a, b) is splitted into (a, x) and (x, b) so if (a, b) exists
         self.losses_combined.pop((a, b), None)  # we get rid of (a, b).
@@ -306,7 +379,7 @@ class Learner1D(BaseLearner):
             # (x_left, x), (x, x_right) and the nth_neighbors nearest
             # neighboring intervals. Since the addition of the
             # point 'x' could change their loss.
-            for ival in _get_intervals(x, self.neighbors, self.nth_neighbors):
+            for ival in _get_intervals(x, self._neighbor_keys, self.nth_neighbors):
                 self._update_interpolated_loss_in_interval(*ival)
 
             # Since 'x' is in between (x_left, x_right),
@@ -332,19 +405,19 @@ class Learner1D(BaseLearner):
             self.losses_combined[x, b] = float("inf")
 
     @staticmethod
-    def _find_neighbors(x, neighbors):
+    def _find_neighbors(x, neighbors, keys):
         if x in neighbors:
             return neighbors[x]
-        pos = neighbors.bisect_left(x)
-        keys = neighbors.keys()
+        pos = keys.bisect_left(x)
         x_left = keys[pos - 1] if pos != 0 else None
-        x_right = keys[pos] if pos != len(neighbors) else None
+        x_right = keys[pos] if pos != len(keys) else None
         return x_left, x_right
 
-    def _update_neighbors(self, x, neighbors):
+    def _update_neighbors(self, x, neighbors, keys):
         if x not in neighbors:  # The point is new
-            x_left, x_right = self._find_neighbors(x, neighbors)
+            x_left, x_right = self._find_neighbors(x, neighbors, keys)
             neighbors[x] = [x_left, x_right]
+            keys.add(x)
             neighbors.get(x_left, [None, None])[1] = x
             neighbors.get(x_right, [None, None])[0] = x
 
@@ -398,16 +471,14 @@ class Learner1D(BaseLearner):
         if not self.bounds[0] <= x <= self.bounds[1]:
             return
 
-        self._update_neighbors(x, self.neighbors_combined)
-        self._update_neighbors(x, self.neighbors)
+        self._update_neighbors(x, self.neighbors_combined, self._neighbor_keys_combined)
+        self._update_neighbors(x, self.neighbors, self._neighbor_keys)
         self._update_scale(x, y)
         self._update_losses(x, real=True)
 
         # If the scale has increased enough, recompute all losses.
         if self._scale[1] > self._recompute_losses_factor * self._oldscale[1]:
-            for interval in reversed(self.losses):
-                self._update_interpolated_loss_in_interval(*interval)
-
+            self._recompute_all_losses()
             self._oldscale = deepcopy(self._scale)
 
     def tell_pending(self, x):
@@ -415,7 +486,7 @@ class Learner1D(BaseLearner):
             # The point is already evaluated before
             return
         self.pending_points.add(x)
-        self._update_neighbors(x, self.neighbors_combined)
+        self._update_neighbors(x, self.neighbors_combined, self._neighbor_keys_combined)
         self._update_losses(x, real=False)
 
     def tell_many(self, xs, ys, *, force=False):
@@ -440,6 +511,10 @@ class Learner1D(BaseLearner):
         # Generate neighbors
         self.neighbors = _get_neighbors_from_list(points)
         self.neighbors_combined = _get_neighbors_from_list(points_combined)
+        self._neighbor_keys = sortedcontainers.SortedList(self.neighbors)
+        self._neighbor_keys_combined = sortedcontainers.SortedList(
+            self.neighbors_combined
+        )
 
         # Update scale
         self._bbox[0] = [points_combined.min(), points_combined.max()]
@@ -450,14 +525,14 @@ class Learner1D(BaseLearner):
 
         # Find the intervals for which the losses should be calculated.
         intervals, intervals_combined = [
-            [(x_m, x_r) for x_m, (x_l, x_r) in neighbors.items()][:-1]
-            for neighbors in (self.neighbors, self.neighbors_combined)
+            list(zip(keys, keys[1:]))
+            for keys in (self._neighbor_keys, self._neighbor_keys_combined)
         ]
 
         # The the losses for the "real" intervals.
         self.losses = loss_manager(self._scale[0])
-        for ival in intervals:
-            self.losses[ival] = self._get_loss_in_interval(*ival)
+        for ival, loss in zip(intervals, self._get_losses_in_intervals(intervals)):
+            self.losses[ival] = loss
 
         # List with "real" intervals that have interpolated intervals inside
         to_interpolate = []
@@ -525,7 +600,16 @@ class Learner1D(BaseLearner):
             # We don't have any points, so return a linspace with 'n' points.
             return np.linspace(*self.bounds, n).tolist(), [np.inf] * n
 
-        quals = loss_manager(self._scale[0])
+        # A heap of (-finite_loss, (x_left, x_right, n), loss), sorted in the
+        # same way as a 'loss_manager', where 'n' is the number of points
+        # inside the interval (including its left bound).
+        quals = []
+        x_scale = self._scale[0]
+
+        def heap_item(qual, loss):
+            finite, _ = finite_loss(qual, loss, x_scale)
+            return -finite, qual, loss
+
         if len(missing_bounds) > 0:
             # There is at least one point in between the bounds.
             all_points = list(self.data.keys()) + list(self.pending_points)
@@ -535,38 +619,49 @@ class Learner1D(BaseLearner):
             ]
             for interval, bound in zip(intervals, self.bounds):
                 if bound in missing_bounds:
-                    quals[(*interval, 1)] = np.inf
+                    quals.append(heap_item((*interval, 1), np.inf))
+            heapq.heapify(quals)
 
         points_to_go = n - len(missing_bounds)
 
         # Calculate how many points belong to each interval.
         i, i_max = 0, len(self.losses_combined)
         for _ in range(points_to_go):
-            qual, loss_qual = quals.peekitem(0) if quals else (None, 0)
             ival, loss_ival = (
                 self.losses_combined.peekitem(i) if i < i_max else (None, 0)
             )
 
-            if qual is None or (
+            if not quals or (
                 ival is not None
-                and self._loss(self.losses_combined, ival) >= self._loss(quals, qual)
+                and self._loss(self.losses_combined, ival)
+                >= (-quals[0][0], quals[0][1])
             ):
                 i += 1
-                quals[(*ival, 2)] = loss_ival / 2
+                heapq.heappush(quals, heap_item((*ival, 2), loss_ival / 2))
             else:
-                quals.pop(qual, None)
-                *xs, n = qual
-                quals[(*xs, n + 1)] = loss_qual * n / (n + 1)
-
-        points = list(
-            itertools.chain.from_iterable(linspace(*ival, n) for (*ival, n) in quals)
-        )
+                _, (*xs, n), loss_qual = quals[0]
+                new_qual = heap_item((*xs, n + 1), loss_qual * n / (n + 1))
+                heapq.heapreplace(quals, new_qual)
+
+        quals.sort()
+        if len(quals) > 50:
+            # For many intervals NumPy is faster than the Python loops below.
+            # This "magic number" is where the two are about equally fast.
+            _, ivals, losses = zip(*quals)
+            x_lefts, x_rights, ns = np.array(ivals).T
+            points, loss_improvements = _linspaces(x_lefts, x_rights, ns, losses)
+        else:
+            points = list(
+                itertools.chain.from_iterable(
+                    linspace(x0, x1, n) for _, (x0, x1, n), _ in quals
+                )
+            )
 
-        loss_improvements = list(
-            itertools.chain.from_iterable(
-                itertools.repeat(quals[x0, x1, n], n - 1) for (x0, x1, n) in quals
+            loss_improvements = list(
+                itertools.chain.from_iterable(
+                    itertools.repeat(loss, n - 1) for _, (x0, x1, n), loss in quals
+                )
             )
-        )
 
         # add the missing bounds
         points = missing_bounds + points
@@ -617,6 +712,7 @@ class Learner1D(BaseLearner):
         self.pending_points = set()
         self.losses_combined = deepcopy(self.losses)
         self.neighbors_combined = deepcopy(self.neighbors)
+        self._neighbor_keys_combined = self._neighbor_keys.copy()
 
     def _get_data(self):
         return self.data
@@ -625,6 +721,24 @@ class Learner1D(BaseLearner):
         if data:
             self.tell_many(*zip(*data.items()))
 
+    def __getstate__(self):
+        # The x and y-values themselves are never modified in place.
+        return self._shallow_state(
+            data=self.data.copy(),
+            pending_points=self.pending_points.copy(),
+            neighbors={x: nb.copy() for x, nb in self.neighbors.items()},
+            neighbors_combined={
+                x: nb.copy() for x, nb in self.neighbors_combined.items()
+            },
+            _neighbor_keys=self._neighbor_keys.copy(),
+            _neighbor_keys_combined=self._neighbor_keys_combined.copy(),
+            losses=self.losses.copy(),
+            losses_combined=self.losses_combined.copy(),
+            _bbox=[bbox.copy() for bbox in self._bbox],
+            _scale=self._scale.copy(),
+            _oldscale=self._oldscale.copy(),
+        )
+
 
 def loss_manager(x_scale):
     def sort_key(ival, loss):
@@ -1,7 +1,7 @@
 import itertools
 import warnings
 from collections import OrderedDict
-from copy import copy
+from copy import copy, deepcopy
 from math import sqrt
 
 import numpy as np
@@ -26,8 +26,9 @@ def deviations(ip):
 
     Returns
     -------
-    deviations : list
-        The deviation per triangle.
+    deviations : numpy.ndarray
+        The deviation per triangle, with shape ``(n_levels, n_triangles)``
+        where ``n_levels`` is the length of the output (1 for scalars).
     """
     values = ip.values / (ip.values.ptp(axis=0).max() or 1)
     gradients = interpolate.interpnd.estimate_gradients_2d_global(
@@ -38,18 +39,16 @@ def deviations(ip):
     vs = values[ip.tri.vertices]
     gs = gradients[ip.tri.vertices]
 
-    def deviation(p, v, g):
-        dev = 0
-        for j in range(3):
-            vest = v[:, j, None] + (
-                (p[:, :, :] - p[:, j, None, :]) * g[:, j, None, :]
-            ).sum(axis=-1)
-            dev += abs(vest - v).max(axis=1)
-        return dev
+    # dp[:, j, k] is the vector from vertex j to vertex k of each triangle.
+    dp = p[:, None, :, :] - p[:, :, None, :]
 
-    n_levels = vs.shape[2]
-    devs = [deviation(p, vs[:, :, i], gs[:, :, i]) for i in range(n_levels)]
-    return devs
+    # vest[:, j, k, i] is the linear estimate of level i at vertex k using
+    # the value and gradient at vertex j, computed for all levels at once.
+    vest = vs[:, :, None, :] + (dp[:, :, :, None, :] * gs[:, :, None, :, :]).sum(
+        axis=-1
+    )
+    devs = abs(vest - vs[:, None, :, :]).max(axis=2).sum(axis=1)
+    return devs.T
 
 
 def areas(ip):
@@ -68,8 +67,14 @@ def areas(ip):
         The area per triangle in ``ip.tri``.
     """
     p = ip.tri.points[ip.tri.vertices]
-    q = p[:, :-1, :] - p[:, -1, None, :]
-    areas = abs(q[:, 0, 0] * q[:, 1, 1] - q[:, 0, 1] * q[:, 1, 0]) / 2
+    x, y = p[..., 0], p[..., 1]
+    areas = (
+        abs(
+            (x[:, 0] - x[:, 2]) * (y[:, 1] - y[:, 2])
+            - (y[:, 0] - y[:, 2]) * (x[:, 1] - x[:, 2])
+        )
+        / 2
+    )
     return areas
 
 
@@ -203,7 +208,7 @@ def default_loss(ip):
     losses : numpy.ndarray
         Loss per triangle in ``ip.tri``.
     """
-    dev = np.sum(deviations(ip), axis=0)
+    dev = deviations(ip).sum(axis=0)
     A = areas(ip)
     losses = dev * np.sqrt(A) + 0.3 * A
     return losses
@@ -231,19 +236,61 @@ def choose_point_in_triangle(triangle, max_badness):
     point : numpy.ndarray
         The x and y coordinate of the suggested new point.
     """
-    a, b, c = triangle
-    area = 0.5 * np.cross(b - a, c - a)
-    triangle_roll = np.roll(triangle, 1, axis=0)
-    edge_lengths = np.linalg.norm(triangle - triangle_roll, axis=1)
-    i = edge_lengths.argmax()
+    a, b, c = np.asarray(triangle, dtype=float).tolist()
+    (ax, ay), (bx, by), (cx, cy) = a, b, c
+    area = 0.5 * ((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+    # The squared lengths of the edges (c, a), (a, b) and (b, c).
+    edges = [(c, a), (a, b), (b, c)]
+    edge_lengths_squared = [
+        (q[0] - p[0]) * (q[0] - p[0]) + (q[1] - p[1]) * (q[1] - p[1]) for p, q in edges
+    ]
+    i = max(range(3), key=edge_lengths_squared.__getitem__)
 
     # We multiply by sqrt(3) / 4 such that a equilateral triangle has badness=1
-    badness = (edge_lengths[i] ** 2 / area) * (sqrt(3) / 4)
+    # The NumPy division gives inf/nan for a zero area, like the batched
+    # version in 'choose_points_in_triangles', instead of raising.
+    badness = (np.float64(edge_lengths_squared[i]) / area) * (sqrt(3) / 4)
     if badness > max_badness:
-        point = (triangle_roll[i] + triangle[i]) / 2
+        (px, py), (qx, qy) = edges[i]
+        point = [(px + qx) / 2, (py + qy) / 2]
     else:
-        point = triangle.mean(axis=0)
-    return point
+        point = [(ax + bx + cx) / 3, (ay + by + cy) / 3]
+    return np.array(point)
+
+
+def choose_points_in_triangles(triangles, max_badness):
+    """Choose a new point inside each of the triangles.
+
+    The same as `choose_point_in_triangle` for many triangles at once.
+
+    Parameters
+    ----------
+    triangles : numpy.ndarray
+        The coordinates of the triangles with shape (n, 3, 2).
+    max_badness : int
+        The badness at which the point is either chosen on a edge or
+        in the middle.
+
+    Returns
+    -------
+    points : numpy.ndarray
+        The x and y coordinates of the suggested new points with shape (n, 2).
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab, ac = b - a, c - a
+    area = 0.5 * (ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0])
+    triangles_roll = np.roll(triangles, 1, axis=1)
+    edges = triangles - triangles_roll
+    edge_lengths_squared = (edges ** 2).sum(axis=-1)
+    i = edge_lengths_squared.argmax(axis=1)
+    rows = np.arange(len(triangles))
+
+    # We multiply by sqrt(3) / 4 such that a equilateral triangle has badness=1
+    badness = (edge_lengths_squared[rows, i] / area) * (sqrt(3) / 4)
+    on_edge = (badness > max_badness)[:, None]
+    edge_centers = (triangles_roll[rows, i] + triangles[rows, i]) / 2
+    return np.where(on_edge, edge_centers, triangles.mean(axis=1))
 
 
 def triangle_loss(ip):
@@ -365,16 +412,50 @@ class Learner2D(BaseLearner):
         self._stack.update({p: np.inf for p in self._bounds_points})
         self.function = function
         self._ip = self._ip_combined = None
+        # The triangulation of the last '_ip', reused as long as only the
+        # values of already known points change.
+        self._ip_tri = None
+
+        # The points of 'data' inside the bounds and their values are
+        # also kept in arrays, see '_add_data_in_bounds'.
+        self._reset_data_in_bounds()
+
+        # Interpolated values of the pending points, valid for as long
+        # as the interpolator in '_interp_values_ip' is not replaced.
+        self._interp_values = {}
+        self._interp_values_ip = None
+
+        # The losses of the triangles of the last interpolator that
+        # was passed to 'loss_per_triangle', see '_losses_per_triangle'.
+        self._losses_cache = (None, None, None)
+
+        # The key (interpolator, n, aspect_ratio) and result of the
+        # last call of 'interpolated_on_grid'.
+        self._grid_cache = (None, None)
 
         self.stack_size = 10
 
     @property
-    def xy_scale(self):
+    def aspect_ratio(self):
+        return self._aspect_ratio
+
+    @aspect_ratio.setter
+    def aspect_ratio(self, aspect_ratio):
+        self._aspect_ratio = aspect_ratio
+        # 'xy_scale' is used for every (un)scaling of points, so only
+        # compute it when the aspect ratio changes.
         xy_scale = self._xy_scale
-        if self.aspect_ratio == 1:
-            return xy_scale
+        if aspect_ratio == 1:
+            self._xy_scale_aspect = xy_scale
         else:
-            return np.array([xy_scale[0], xy_scale[1] / self.aspect_ratio])
+            self._xy_scale_aspect = np.array([xy_scale[0], xy_scale[1] / aspect_ratio])
+        # The interpolators and their triangulation are built from the
+        # scaled points, so they are invalid now.
+        self._ip = self._ip_combined = self._ip_tri = None
+
+    @property
+    def xy_scale(self):
+        return self._xy_scale_aspect
 
     def _scale(self, points):
         points = np.asarray(points, dtype=float)
@@ -427,6 +508,14 @@ class Learner2D(BaseLearner):
         interpolated_on_grid : 2D numpy.ndarray
         """
         ip = self.interpolator(scaled=True)
+        # Live plots call this repeatedly, often without new data.
+        key, grid = self._grid_cache
+        if key != (ip, n, self.aspect_ratio):
+            grid = self._interpolate_on_grid(ip, n)
+            self._grid_cache = (ip, n, self.aspect_ratio), grid
+        return tuple(a.copy() for a in grid)
+
+    def _interpolate_on_grid(self, ip, n):
         if n is None:
             # Calculate how many grid points are needed.
             # factor from A=√3/4 * a² (equilateral triangle)
@@ -444,20 +533,66 @@ class Learner2D(BaseLearner):
         return xs, ys, zs
 
     def _data_in_bounds(self):
-        if self.data:
-            points = np.array(list(self.data.keys()))
-            values = np.array(list(self.data.values()), dtype=float)
-            ll, ur = np.reshape(self.bounds, (2, 2)).T
-            inds = np.all(np.logical_and(ll <= points, points <= ur), axis=1)
-            return points[inds], values[inds].reshape(-1, self.vdim)
+        n = self._n_in_bounds
+        if n:
+            return self._points_in_bounds[:n], self._values_in_bounds[:n]
         return np.zeros((0, 2)), np.zeros((0, self.vdim), dtype=float)
 
+    def _add_data_in_bounds(self, point, value):
+        """Add the point to the in-bounds arrays and return
+        whether it is a new point."""
+        # The arrays grow by doubling and '_row_in_bounds' maps
+        # every point to its row.
+        row = self._row_in_bounds.get(point)
+        is_new = row is None
+        if not is_new:
+            # The arrays returned by '_data_in_bounds' might still be used
+            # by an interpolator, so do not overwrite them in place.
+            self._values_in_bounds = self._values_in_bounds.copy()
+        else:
+            row = self._n_in_bounds
+            if row == len(self._points_in_bounds):
+                size = max(2 * row, 16)
+                points = np.empty((size, 2))
+                values = np.empty((size, self.vdim))
+                points[:row] = self._points_in_bounds[:row]
+                if row:
+                    values[:row] = self._values_in_bounds[:row]
+                self._points_in_bounds = points
+                self._values_in_bounds = values
+            self._points_in_bounds[row] = point
+            self._row_in_bounds[point] = row
+            self._n_in_bounds += 1
+        self._values_in_bounds[row] = np.asarray(value, dtype=float)
+        return is_new
+
+    def _reset_data_in_bounds(self):
+        self._points_in_bounds = np.empty((0, 2))
+        self._values_in_bounds = None
+        self._n_in_bounds = 0
+        self._row_in_bounds = {}
+        for point, value in self.data.items():
+            if self.inside_bounds(point):
+                self._add_data_in_bounds(point, value)
+
     def _data_interp(self):
         if self.pending_points:
             points = list(self.pending_points)
             if self.bounds_are_done:
                 ip = self.interpolator(scaled=True)
-                values = ip(self._scale(points))
+                if ip is not self._interp_values_ip:
+                    self._interp_values = {}
+                    self._interp_values_ip = ip
+                # Only interpolate the points that were not interpolated
+                # with this interpolator before.
+                new_points = [p for p in points if p not in self._interp_values]
+                if new_points:
+                    new_values = ip(self._scale(new_points))
+                    self._interp_values.update(zip(new_points, new_values))
+                if len(new_points) == len(points):
+                    values = new_values
+                else:
+                    values = np.array([self._interp_values[p] for p in points])
             else:
                 # Without the bounds the interpolation cannot be done properly,
                 # so we just set everything to zero.
@@ -507,8 +642,12 @@ class Learner2D(BaseLearner):
         if scaled:
             if self._ip is None:
                 points, values = self._data_in_bounds()
-                points = self._scale(points)
-                self._ip = interpolate.LinearNDInterpolator(points, values)
+                if self._ip_tri is None:
+                    points = self._scale(points)
+                    self._ip = interpolate.LinearNDInterpolator(points, values)
+                    self._ip_tri = self._ip.tri
+                else:
+                    self._ip = interpolate.LinearNDInterpolator(self._ip_tri, values)
             return self._ip
         else:
             points, values = self._data_in_bounds()
@@ -519,11 +658,25 @@ class Learner2D(BaseLearner):
         containing the learner's data *and* interpolated data of
         the `pending_points`."""
         if self._ip_combined is None:
-            points, values = self._data_combined()
-            points = self._scale(points)
-            self._ip_combined = interpolate.LinearNDInterpolator(points, values)
+            if not self.pending_points:
+                # Without pending points this is the same interpolator as
+                # the one of the real data, so reuse it and its triangulation.
+                self._ip_combined = self.interpolator(scaled=True)
+            else:
+                points, values = self._data_combined()
+                points = self._scale(points)
+                self._ip_combined = interpolate.LinearNDInterpolator(points, values)
         return self._ip_combined
 
+    def _losses_per_triangle(self, ip):
+        # The same interpolator is often used for several calls of
+        # '_fill_stack' and 'loss', so only compute the losses once.
+        cached_ip, loss_per_triangle, losses = self._losses_cache
+        if ip is not cached_ip or self.loss_per_triangle is not loss_per_triangle:
+            losses = self.loss_per_triangle(ip)
+            self._losses_cache = (ip, self.loss_per_triangle, losses)
+        return losses
+
     def inside_bounds(self, xy):
         x, y = xy
         (xmin, xmax), (ymin, ymax) = self.bounds
@@ -534,6 +687,8 @@ class Learner2D(BaseLearner):
         self.data[point] = value
         if not self.inside_bounds(point):
             return
+        if self._add_data_in_bounds(point, value):
+            self._ip_tri = None
         self.pending_points.discard(point)
         self._ip = None
         self._stack.pop(point, None)
@@ -553,35 +708,55 @@ class Learner2D(BaseLearner):
         # Interpolate
         ip = self._interpolator_combined()
 
-        losses = self.loss_per_triangle(ip)
+        losses = self._losses_per_triangle(ip)
+
+        # The triangles are used in the order 'np.argmax' would pick them:
+        # first the NaN losses, then decreasing loss, and on ties the lowest
+        # index wins. Usually only the first 'stack_till' triangles are
+        # needed, so those are sorted first and the others only when we
+        # get to them.
+        priorities = -np.asarray(losses, dtype=float)
+        is_nan = np.isnan(priorities)
+        nan_indices = np.flatnonzero(is_nan)
+        not_nan_indices = np.flatnonzero(~is_nan)
+        priorities = priorities[not_nan_indices]
+        n_missing = stack_till - len(self._stack) - len(nan_indices)
+        k = min(max(n_missing, 1), len(priorities))
+        kth = np.partition(priorities, k - 1)[k - 1] if k else np.inf
+
+        def sorted_indices(mask):
+            order = np.argsort(priorities[mask], kind="stable")
+            return not_nan_indices[mask][order]
+
+        def batches():
+            yield nan_indices
+            yield sorted_indices(priorities <= kth)
+            yield sorted_indices(priorities > kth)
+
+        # np.clip results in numerical precision problems
+        # https://github.com/python-adaptive/adaptive/issues/7
+        clip = lambda x, l, u: max(l, min(u, x))  # noqa: E731
+        (x_min, x_max), (y_min, y_max) = self.bounds
+        tri_points = ip.tri.points
+        tri_vertices = ip.tri.vertices
 
         points_new = []
         losses_new = []
-        for j, _ in enumerate(losses):
-            jsimplex = np.argmax(losses)
-            triangle = ip.tri.points[ip.tri.vertices[jsimplex]]
-            point_new = choose_point_in_triangle(triangle, max_badness=5)
-            point_new = tuple(self._unscale(point_new))
-
-            # np.clip results in numerical precision problems
-            # https://github.com/python-adaptive/adaptive/issues/7
-            clip = lambda x, l, u: max(l, min(u, x))  # noqa: E731
-            point_new = (
-                clip(point_new[0], *self.bounds[0]),
-                clip(point_new[1], *self.bounds[1]),
-            )
+        for indices in batches():
+            triangles = tri_points[tri_vertices[indices]]
+            points = choose_points_in_triangles(triangles, max_badness=5)
+            for jsimplex, (x, y) in zip(indices.tolist(), self._unscale(points)):
+                point_new = (clip(x, x_min, x_max), clip(y, y_min, y_max))
 
-            loss_new = losses[jsimplex]
+                loss_new = losses[jsimplex]
 
-            points_new.append(point_new)
-            losses_new.append(loss_new)
+                points_new.append(point_new)
+                losses_new.append(loss_new)
 
-            self._stack[point_new] = loss_new
+                self._stack[point_new] = loss_new
 
-            if len(self._stack) >= stack_till:
-                break
-            else:
-                losses[jsimplex] = -np.inf
+                if len(self._stack) >= stack_till:
+                    return points_new, losses_new
 
         return points_new, losses_new
 
@@ -610,8 +785,7 @@ class Learner2D(BaseLearner):
 
         if not tell_pending:
             self._stack = OrderedDict(zip(points[: self.stack_size], loss_improvements))
-            for point in points[:n]:
-                self.pending_points.discard(point)
+            self.pending_points.difference_update(points[:n])
 
         return points[:n], loss_improvements[:n]
 
@@ -620,7 +794,7 @@ class Learner2D(BaseLearner):
         if not self.bounds_are_done:
             return np.inf
         ip = self.interpolator(scaled=True) if real else self._interpolator_combined()
-        losses = self.loss_per_triangle(ip)
+        losses = self._losses_per_triangle(ip)
         return losses.max()
 
     def remove_unfinished(self):
@@ -702,7 +876,21 @@ class Learner2D(BaseLearner):
 
     def _set_data(self, data):
         self.data = data
+        self._reset_data_in_bounds()
+        self._ip_tri = None
         # Remove points from stack if they already exist
         for point in copy(self._stack):
             if point in self.data:
                 self._stack.pop(point)
+
+    def __getstate__(self):
+        # The caches are filled again when needed, so leave them out
+        # instead of copying them.
+        state = self.__dict__.copy()
+        state.update(
+            _interp_values={},
+            _interp_values_ip=None,
+            _losses_cache=(None, None, None),
+            _grid_cache=(None, None),
+        )
+        return deepcopy(state)
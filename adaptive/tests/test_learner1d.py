@@ -3,8 +3,9 @@ import random
 import numpy as np
 
 from adaptive.learner import Learner1D
-from adaptive.learner.learner1D import curvature_loss_function
+from adaptive.learner.learner1D import _linspaces, curvature_loss_function, linspace
 from adaptive.runner import simple
+from adaptive.utils import restore
 
 
 def test_pending_loss_intervals():
@@ -387,3 +388,72 @@ def test_NaN_loss():
 
     learner = Learner1D(f, bounds=(-1, 1))
     simple(learner, lambda l: l.npoints > 100)
+
+
+def test_vectorized_default_loss_equals_loss_per_interval():
+    def f(x):
+        return np.tanh(20 * x)
+
+    def f_vec(x):
+        return np.tanh(20 * x), np.tanh(20 * (x - 0.4))
+
+    for function in [f, f_vec]:
+        learner = Learner1D(function, bounds=(-1, 1))
+        simple(learner, goal=lambda l: l.npoints > 100)
+        intervals = list(learner.losses)
+        losses = learner._get_losses_in_intervals(intervals)
+        expected = [learner._get_loss_in_interval(*ival) for ival in intervals]
+        np.testing.assert_array_equal(losses, expected)
+
+
+def test_restore():
+    def f(x):
+        return np.tanh(20 * x)
+
+    learner = Learner1D(f, bounds=(-1, 1))
+    simple(learner, goal=lambda l: l.npoints > 50)
+    learner.ask(5)
+    points = learner.ask(10, tell_pending=False)
+    data = learner.data.copy()
+    neighbors = {x: nb.copy() for x, nb in learner.neighbors_combined.items()}
+
+    with restore(learner):
+        xs, _ = learner.ask(10)
+        for x in xs[:5]:
+            learner.tell(x, f(x))
+
+    assert learner.data == data
+    assert learner.neighbors_combined == neighbors
+    assert learner.ask(10, tell_pending=False) == points
+
+
+def test_linspaces_equals_linspace_per_interval():
+    x_lefts = np.sort(np.random.uniform(-1, 1, 100))
+    x_rights = x_lefts + np.random.uniform(0, 0.1, 100)
+    ns = np.random.randint(1, 5, 100)
+    losses = np.random.uniform(0, 1, 100)
+    points, loss_improvements = _linspaces(x_lefts, x_rights, ns.astype(float), losses)
+
+    expected_points = []
+    expected_loss_improvements = []
+    for x_left, x_right, n, loss in zip(x_lefts, x_rights, ns.tolist(), losses):
+        expected_points += linspace(x_left, x_right, n)
+        expected_loss_improvements += [loss] * (n - 1)
+    assert points == expected_points
+    assert loss_improvements == expected_loss_improvements
+
+
+def test_ask_many_intervals():
+    """Asking for points in more than 50 intervals takes the vectorized
+    path, which must give the same points as 'linspace' per interval."""
+    learner = Learner1D(lambda x: x ** 3, bounds=(-1, 1))
+    simple(learner, goal=lambda l: l.npoints > 100)
+    xs, _ = learner.ask(300, tell_pending=False)
+
+    known = sorted(learner.data)
+    n_intervals = 0
+    for x_left, x_right in zip(known, known[1:]):
+        inside = sorted(x for x in xs if x_left < x < x_right)
+        assert inside == linspace(x_left, x_right, len(inside) + 1)
+        n_intervals += bool(inside)
+    assert n_intervals > 50
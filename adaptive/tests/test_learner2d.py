@@ -0,0 +1,204 @@
+from math import sqrt
+
+import numpy as np
+import pytest
+
+from adaptive.learner import Learner2D
+from adaptive.learner.learner2D import (
+    choose_point_in_triangle,
+    choose_points_in_triangles,
+    resolution_loss_function,
+)
+from adaptive.runner import simple
+from adaptive.utils import restore
+
+
+def plane(xy):
+    x, y = xy
+    return x + 2 * y
+
+
+def test_retell_reuses_triangulation():
+    learner = Learner2D(plane, bounds=[(-1, 1), (-1, 1)])
+    simple(learner, goal=lambda l: l.npoints >= 40)
+    points = list(learner.data)
+
+    ip = learner.interpolator(scaled=True)
+    old_values = ip.values.copy()
+    learner.tell(points[10], 10.0)
+    new_ip = learner.interpolator(scaled=True)
+
+    # Only a value changed, so the triangulation is reused, but the
+    # values of the previous interpolator are left untouched.
+    assert new_ip.tri is ip.tri
+    np.testing.assert_array_equal(ip.values, old_values)
+
+    control = Learner2D(plane, bounds=[(-1, 1), (-1, 1)])
+    for point in points:
+        control.tell(point, learner.data[point])
+    control_ip = control.interpolator(scaled=True)
+    xs = np.random.rand(100, 2) - 0.5
+    np.testing.assert_array_equal(new_ip(xs), control_ip(xs))
+
+
+def test_retell_after_changing_aspect_ratio():
+    learner = Learner2D(plane, bounds=[(-1, 1), (-1, 1)])
+    simple(learner, goal=lambda l: l.npoints >= 40)
+    learner.interpolator(scaled=True)
+
+    learner.aspect_ratio = 4
+    point = next(iter(learner.data))
+    learner.tell(point, plane(point))
+
+    # A plane is interpolated exactly inside the triangulation.
+    points = [(0.3, 0.7), (-0.5, 0.2)]
+    ip = learner.interpolator(scaled=True)
+    np.testing.assert_allclose(ip(learner._scale(points)).ravel(), [1.7, -0.1])
+
+
+def choose_point_in_triangle_reference(triangle, max_badness):
+    # The original per-triangle implementation.
+    a, b, c = triangle
+    area = 0.5 * np.cross(b - a, c - a)
+    triangle_roll = np.roll(triangle, 1, axis=0)
+    edge_lengths = np.linalg.norm(triangle - triangle_roll, axis=1)
+    i = edge_lengths.argmax()
+    badness = (edge_lengths[i] ** 2 / area) * (sqrt(3) / 4)
+    if badness > max_badness:
+        return (triangle_roll[i] + triangle[i]) / 2
+    else:
+        return triangle.mean(axis=0)
+
+
+def test_choose_points_in_triangles():
+    rng = np.random.RandomState(0)
+    triangles = rng.uniform(-1, 1, (1000, 3, 2))
+    special = [
+        [(0, 0), (1, 0), (0.5, sqrt(3) / 2)],  # equilateral: centroid
+        [(0, 0), (10, 0), (5, 0.1)],  # flat: middle of the longest edge
+        [(0, 0), (2, 0), (1, 5)],  # two longest edges of equal length
+        [(0, 0), (1, 1), (2, 2)],  # zero area
+        [(1, 1), (1, 1), (1, 1)],  # all vertices coincide
+        [(0, 0), (np.nan, 0), (1, 1)],  # NaN coordinate
+    ]
+    triangles = np.concatenate([triangles, np.array(special, dtype=float)])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for max_badness in [1, 5, 50]:
+            points = choose_points_in_triangles(triangles, max_badness)
+            expected = [
+                choose_point_in_triangle_reference(t, max_badness) for t in triangles
+            ]
+            np.testing.assert_array_equal(points, expected)
+            for triangle, point in zip(triangles, points):
+                np.testing.assert_array_equal(
+                    choose_point_in_triangle(triangle, max_badness), point
+                )
+
+    # Check that both branches are taken.
+    points = choose_points_in_triangles(triangles[-6:-4], max_badness=5)
+    np.testing.assert_array_equal(points, [triangles[-6].mean(axis=0), (5, 0)])
+
+
+def fill_stack_reference(learner, stack_till):
+    # The original implementation, which picks the triangles with
+    # 'np.argmax' and then sets their loss to -inf.
+    ip = learner._interpolator_combined()
+    losses = np.array(learner.loss_per_triangle(ip), dtype=float)
+    stack = dict(learner._stack)
+    points_new = []
+    losses_new = []
+    for _ in range(len(losses)):
+        jsimplex = np.argmax(losses)
+        triangle = ip.tri.points[ip.tri.vertices[jsimplex]]
+        point = learner._unscale(choose_point_in_triangle_reference(triangle, 5))
+        point = tuple(np.clip(point, *np.array(learner.bounds).T))
+        points_new.append(point)
+        losses_new.append(losses[jsimplex])
+        stack[point] = losses[jsimplex]
+        if len(stack) >= stack_till:
+            break
+        losses[jsimplex] = -np.inf
+    return points_new, losses_new
+
+
+def nan_in_corner(xy):
+    x, y = xy
+    return np.nan if x > 0.5 and y > 0.5 else x + 2 * y
+
+
+@pytest.mark.parametrize(
+    "function, loss_per_triangle",
+    [(plane, None), (nan_in_corner, resolution_loss_function(0.001, 0.2))],
+)
+def test_fill_stack_picks_triangles_like_argmax(function, loss_per_triangle):
+    learner = Learner2D(
+        function, bounds=[(-1, 1), (-1, 1)], loss_per_triangle=loss_per_triangle
+    )
+    for i in range(30):
+        points, _ = learner.ask(3)
+        for point in points:
+            learner.tell(point, function(point))
+
+    learner._stack.clear()
+    if loss_per_triangle is not None:
+        losses = learner.loss_per_triangle(learner._interpolator_combined())
+        assert np.isnan(losses).any() and np.isinf(losses).any()
+
+    expected_points, expected_losses = fill_stack_reference(learner, 10)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        points, losses = learner._fill_stack(stack_till=10)
+    np.testing.assert_array_equal(losses, expected_losses)
+    np.testing.assert_allclose(points, expected_points, rtol=0, atol=1e-15)
+    assert len(learner._stack) == 10
+
+
+def test_data_in_bounds_matches_data(tmp_path):
+    def f(xy):
+        x, y = xy
+        return [x, y, x * y]
+
+    learner = Learner2D(f, bounds=[(-1, 1), (-1, 1)])
+    rng = np.random.RandomState(0)
+    # More than the initial 16 rows, some points outside the bounds
+    # and some points that are told twice.
+    points = [tuple(p) for p in rng.uniform(-1.5, 1.5, (50, 2))]
+    for point in points + points[::7]:
+        learner.tell(point, f(point) if rng.rand() < 0.5 else [0, 0, 0])
+
+    def check(learner):
+        points = np.array([p for p in learner.data if learner.inside_bounds(p)])
+        values = np.array([learner.data[tuple(p)] for p in points], dtype=float)
+        data_points, data_values = learner._data_in_bounds()
+        np.testing.assert_array_equal(data_points, points)
+        np.testing.assert_array_equal(data_values, values)
+
+    assert sum(map(learner.inside_bounds, learner.data)) > 16
+    check(learner)
+
+    fname = str(tmp_path / "learner.pickle")
+    learner.save(fname)
+    other = Learner2D(f, bounds=[(-1, 1), (-1, 1)])
+    other.load(fname)
+    check(other)
+
+
+def test_caches_are_not_in_the_state():
+    learner = Learner2D(plane, bounds=[(-1, 1), (-1, 1)])
+    simple(learner, goal=lambda l: l.npoints >= 40)
+    learner.ask(5)
+    learner.ask(5)
+    loss = learner.loss()
+    grid = learner.interpolated_on_grid()
+
+    state = learner.__getstate__()
+    assert state["_interp_values"] == {}
+    assert state["_losses_cache"] == (None, None, None)
+    assert state["_grid_cache"] == (None, None)
+
+    with restore(learner):
+        learner.tell((0.1, 0.1), 0.3)
+        learner.loss()
+    assert learner.loss() == loss
+    for a, b in zip(learner.interpolated_on_grid(), grid):
+        np.testing.assert_array_equal(a, b)